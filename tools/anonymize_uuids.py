@@ -16,24 +16,58 @@ Usage:
 
 If output is not specified, writes to input.anonymized.jsonl
 Use --in-place to overwrite the original file
+Use --strict to validate each line as JSON; invalid lines are left untouched
 Use - or no arguments to read from stdin and write to stdout
 """
 
 import json
+import mmap
+import os
 import re
 import sys
 import secrets
 import tempfile
 import shutil
+import stat
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Any
+from typing import Callable, Dict, List, Optional, Tuple
 
 
-# UUID pattern (8-4-4-4-12 hex digits)
+# Lowercases A-F and leaves every other byte alone
+_LOWER_HEX = bytes.maketrans(b'ABCDEF', b'abcdef')
+
+# UUIDs are 8-4-4-4-12 hex digits between word boundaries, in either case.
+# Byte class table for lowercased UUID candidates: hex digits map to '0',
+# '-' maps to itself and everything else to NUL, so a 36-byte candidate is a
+# UUID exactly when its translation equals _UUID_SHAPE.
+_HEX_LUT = bytes(
+    0x30 if chr(b) in '0123456789abcdef' else (0x2D if b == 0x2D else 0)
+    for b in range(256)
+)
+_UUID_SHAPE = b'00000000-0000-0000-0000-000000000000'
+
+# The same UUID definition for decoded text. Used for string literals where
+# UUID characters may be written as \uXXXX escapes, which the byte-level
+# scanner cannot see through; _UUID_CHAR_ESCAPE finds such escapes.
 UUID_PATTERN = re.compile(
-    r'\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b',
-    re.IGNORECASE
+    r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b'
 )
+_UUID_CHAR_ESCAPE = re.compile(rb'\\u00(?:2[dD]|3[0-9]|4[1-6]|6[1-6])')
+
+# Buffer size for file I/O; logs can be multi-GB, so amortize syscalls
+IO_BUFFER_SIZE = 1 << 20
+
+# Rewritten string literals are cached per file, since logs repeat the same
+# system prompts and tool definitions; short strings are cheaper to rescan, and
+# long ones (tool output, file contents) are rarely repeated and would make
+# the cache's memory use unbounded
+STRING_CACHE_SIZE = 4096
+STRING_CACHE_MIN_LENGTH = 64
+STRING_CACHE_MAX_LENGTH = 4 << 10
+
+# Files at least this large are anonymized by several processes
+PARALLEL_MIN_SIZE = 64 << 20
 
 
 def generate_random_prefix() -> str:
@@ -41,132 +75,546 @@ def generate_random_prefix() -> str:
     return secrets.token_hex(4)
 
 
-def anonymize_uuid(uuid: str, mapping: Dict[str, str], prefix: str, counter: Dict[str, int]) -> str:
+def anonymize_uuid(uuid: bytes, mapping: Dict[bytes, bytes], template: bytes, counter: List[int]) -> bytes:
     """
     Anonymize a UUID using the mapping dictionary.
 
     Args:
-        uuid: The UUID to anonymize
+        uuid: The UUID to anonymize, in lowercase
         mapping: Dictionary mapping original UUIDs to anonymized ones
-        prefix: The random prefix for this file
-        counter: Dictionary with a single 'count' key for tracking the sequence
+        template: The anonymized UUID stem for this file ("{prefix}-0000-0000-0000-")
+        counter: One-element list holding the last sequence number used
 
     Returns:
         The anonymized UUID
     """
-    uuid_lower = uuid.lower()
+    anonymized = mapping.get(uuid)
 
-    if uuid_lower not in mapping:
+    if anonymized is None:
         # Create new anonymized UUID: prefix-0000-0000-0000-{sequential}
-        counter['count'] += 1
-        seq_num = f"{counter['count']:012d}"
-        anonymized = f"{prefix}-0000-0000-0000-{seq_num}"
-        mapping[uuid_lower] = anonymized
+        seq_num = counter[0] + 1
+        counter[0] = seq_num
+        anonymized = template + b'%012d' % seq_num
+        mapping[uuid] = anonymized
+
+    return anonymized
+
+
+# Word characters (as seen by a regex \b) among the ASCII bytes.
+_WORD_LUT = bytes(1 if chr(b).isalnum() or b == 0x5F else 0 for b in range(128))
+
 
-    return mapping[uuid_lower]
+def _is_word_char(c: str) -> bool:
+    """Return True if c counts as a word character for a regex word boundary."""
+    return c.isalnum() or c == '_'
 
 
-def anonymize_value(value: Any, mapping: Dict[str, str], prefix: str, counter: Dict[str, int]) -> Any:
+def _odd_backslashes(buf: bytes, lo: int, i: int) -> bool:
+    """Return True if buf[i] is preceded by an odd run of backslashes."""
+    j = i
+    while j > lo and buf[j - 1] == 0x5C:
+        j -= 1
+    return bool((i - j) & 1)
+
+
+def _word_char_before(buf: bytes, lo: int, i: int) -> bool:
     """
-    Recursively anonymize UUIDs in any JSON value.
+    Return True if a match cannot start at buf[i]: either the character ending
+    just before it is a word character, or buf[i] is inside an escape.
 
-    Args:
-        value: The value to process (can be dict, list, str, or primitive)
-        mapping: UUID mapping dictionary
-        prefix: Random prefix for this file
-        counter: Counter for sequential numbering
+    buf[lo:i] is raw JSON string content, so escapes and multi-byte UTF-8 are
+    decoded first; a UUID after a literal \\n still starts on a boundary.
+    """
+    b = buf[i - 1]
+    if b == 0x5C and _odd_backslashes(buf, lo, i):
+        # buf[i] is the letter of an escape such as \b or \f, not a character of its own
+        return True
+    for j in range(max(lo + 1, i - 4), i):
+        if buf[j] == 0x75 and _odd_backslashes(buf, lo, j):
+            # buf[i] is one of the hex digits of a \uXXXX escape
+            return True
+    if b >= 0x80:
+        return _is_word_char(buf[max(lo, i - 4):i].decode('utf-8', 'replace')[-1])
+    if _odd_backslashes(buf, lo, i - 1):
+        # Second half of a two-character escape: \b \f \n \r \t \" \/ \\
+        return False
+    if i - 6 >= lo and buf[i - 5] == 0x75 and _odd_backslashes(buf, lo, i - 5):
+        try:
+            return _is_word_char(chr(int(buf[i - 4:i], 16)))
+        except ValueError:
+            pass
+    return bool(_WORD_LUT[b])
+
+
+def _word_char_at(buf: bytes, i: int) -> bool:
+    """Return True if the (possibly escaped) character at buf[i] is a word character."""
+    b = buf[i]
+    if b >= 0x80:
+        return _is_word_char(buf[i:i + 4].decode('utf-8', 'replace')[0])
+    if b == 0x5C:
+        # Of the JSON escapes only \uXXXX can decode to a word character
+        if buf[i + 1:i + 2] == b'u':
+            try:
+                return _is_word_char(chr(int(buf[i + 2:i + 6], 16)))
+            except ValueError:
+                pass
+        return False
+    return bool(_WORD_LUT[b])
+
+
+# Characters of the two-character JSON escapes, by the byte after the backslash
+_SIMPLE_ESCAPES = {
+    0x22: '"', 0x2F: '/', 0x5C: '\\', 0x62: '\b', 0x66: '\f', 0x6E: '\n', 0x72: '\r', 0x74: '\t',
+}
+
+
+def _decode_string(buf: bytes, lo: int, hi: int) -> Tuple[str, List[int]]:
+    """
+    Decode raw JSON string content buf[lo:hi], keeping track of where each character came from.
 
     Returns:
-        The value with all UUIDs anonymized
-    """
-    if isinstance(value, str):
-        # Replace all UUIDs in the string
-        return UUID_PATTERN.sub(
-            lambda m: anonymize_uuid(m.group(0), mapping, prefix, counter),
-            value
-        )
-    elif isinstance(value, dict):
-        return {k: anonymize_value(v, mapping, prefix, counter) for k, v in value.items()}
-    elif isinstance(value, list):
-        return [anonymize_value(item, mapping, prefix, counter) for item in value]
-    else:
-        # Numbers, booleans, null - return as-is
-        return value
+        The decoded text, and the offset in buf of each of its characters
+        followed by hi, so character k was encoded as buf[offsets[k]:offsets[k + 1]]
 
+    Raises:
+        ValueError: If a \\uXXXX escape is malformed
+    """
+    chars = []
+    offsets = []
+    i = lo
+    while i < hi:
+        offsets.append(i)
+        b = buf[i]
+        if b == 0x5C:
+            if buf[i + 1] == 0x75:
+                code = int(buf[i + 2:i + 6], 16)
+                i += 6
+                # Combine surrogate pairs into one character, as json.loads does
+                if 0xD800 <= code < 0xDC00 and buf[i:i + 2] == b'\\u' and i + 6 <= hi:
+                    low = int(buf[i + 2:i + 6], 16)
+                    if 0xDC00 <= low < 0xE000:
+                        code = 0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)
+                        i += 6
+                chars.append(chr(code))
+            else:
+                chars.append(_SIMPLE_ESCAPES.get(buf[i + 1], '\ufffd'))
+                i += 2
+        elif b < 0x80:
+            chars.append(chr(b))
+            i += 1
+        else:
+            n = 2 if b < 0xE0 else 3 if b < 0xF0 else 4
+            chars.append(buf[i:i + n].decode('utf-8', 'replace')[0])
+            i += n
+    offsets.append(hi)
+    return ''.join(chars), offsets
+
+
+def make_rewriter(template: bytes, mapping: Dict[bytes, bytes], counter: List[int],
+                  cache: Optional[Dict[bytes, bytes]] = None) -> Callable[[bytes, int, int, bytearray], None]:
+    """
+    Build a rewrite_line function bound to one file's anonymization state.
 
-def anonymize_jsonl_stream(infile, outfile) -> Dict[str, str]:
+    The template, mapping, counter and string cache are fixed for a whole
+    file, so the hot-path functions close over them instead of having them
+    passed through every call.
+
+    Args:
+        template: The anonymized UUID stem for this file ("{prefix}-0000-0000-0000-")
+        mapping: Dictionary mapping original UUIDs to anonymized ones, filled in as UUIDs are found
+        counter: One-element list holding the last sequence number used
+        cache: Dictionary to cache rewritten string literals in (a new one by default)
+
+    Returns:
+        rewrite_line(buf, lo, hi, out), which appends buf[lo:hi] to out with all UUIDs anonymized
+    """
+    mapping_get = mapping.get
+
+    # Rewritten string literals, evicted in FIFO order once full. Results stay
+    # valid because a UUID's mapping never changes once assigned.
+    if cache is None:
+        cache = {}
+    cache_get = cache.get
+
+    def scan_uuids(buf: bytes, lo: int, hi: int, out: bytearray) -> None:
+        """
+        Append buf[lo:hi] (raw JSON string content) to out with every UUID anonymized.
+
+        Candidates are located by jumping between '-' bytes with bytes.find
+        (every UUID has one 8 characters in) and validated with a single
+        bytes.translate, so no Match objects are built.
+        """
+        last = lo
+        dash = buf.find(b'-', lo + 8, hi)
+        while dash != -1:
+            start = dash - 8
+            end = start + 36
+            if end > hi:
+                break
+            # Most dashes are not in UUIDs; check the dash skeleton before
+            # slicing out and classifying the whole candidate
+            if buf[dash + 5] != 0x2D or buf[dash + 10] != 0x2D or buf[dash + 15] != 0x2D:
+                dash = buf.find(b'-', dash + 1, hi)
+                continue
+            candidate = buf[start:end].translate(_LOWER_HEX)
+            if (candidate.translate(_HEX_LUT) == _UUID_SHAPE
+                    and (start == lo or not _word_char_before(buf, lo, start))
+                    and (end == hi or not _word_char_at(buf, end))):
+                anonymized = mapping_get(candidate)
+                if anonymized is None:
+                    anonymized = anonymize_uuid(candidate, mapping, template, counter)
+                out.extend(buf[last:start])
+                out.extend(anonymized)
+                last = end
+                dash = buf.find(b'-', end + 8, hi)
+            else:
+                dash = buf.find(b'-', dash + 1, hi)
+        out.extend(buf[last:hi])
+
+    def scan_escaped(buf: bytes, lo: int, hi: int, out: bytearray) -> None:
+        """
+        Like scan_uuids, for string content where UUID characters may be \\uXXXX escapes.
+
+        The content is decoded and matched with UUID_PATTERN. Each character of
+        a matched UUID is written back in the form it had (a literal byte or a
+        \\uXXXX escape), so the output is as long as the input.
+        """
+        try:
+            text, offsets = _decode_string(buf, lo, hi)
+        except ValueError:
+            # Not valid JSON; fall back to the byte-level scan
+            scan_uuids(buf, lo, hi, out)
+            return
+
+        last = lo
+        for match in UUID_PATTERN.finditer(text):
+            start, end = match.span()
+            candidate = match.group().lower().encode('ascii')
+            anonymized = mapping_get(candidate)
+            if anonymized is None:
+                anonymized = anonymize_uuid(candidate, mapping, template, counter)
+            out.extend(buf[last:offsets[start]])
+            for k, c in enumerate(anonymized, start):
+                if offsets[k + 1] - offsets[k] == 1:
+                    out.append(c)
+                else:
+                    out.extend(b'\\u%04x' % c)
+            last = offsets[end]
+        out.extend(buf[last:hi])
+
+    def scan_string(buf: bytes, lo: int, hi: int, out: bytearray) -> None:
+        """Scan the contents of one string literal, reusing the result for repeated cacheable strings."""
+        scan = scan_uuids
+        if buf.find(b'\\u', lo, hi) != -1 and _UUID_CHAR_ESCAPE.search(buf, lo, hi):
+            scan = scan_escaped
+        if not STRING_CACHE_MIN_LENGTH <= hi - lo <= STRING_CACHE_MAX_LENGTH:
+            scan(buf, lo, hi, out)
+            return
+
+        text = buf[lo:hi]
+        rewritten = cache_get(text)
+        if rewritten is None:
+            mark = len(out)
+            scan(text, 0, len(text), out)
+            if len(cache) >= STRING_CACHE_SIZE:
+                del cache[next(iter(cache))]
+            cache[text] = bytes(out[mark:])
+        else:
+            out.extend(rewritten)
+
+    def rewrite_line(buf: bytes, lo: int, hi: int, out: bytearray) -> None:
+        """
+        Anonymize UUIDs in one raw JSON line (buf[lo:hi]) without decoding it.
+
+        Only the contents of string literals (keys and values) are scanned;
+        everything else is copied through byte-for-byte.
+        """
+        last = lo
+        # Strings without a '-' can only hold a UUID if it is written with escapes
+        escapes = _UUID_CHAR_ESCAPE.search(buf, lo, hi) is not None
+        quote = buf.find(b'"', lo, hi)
+        while quote != -1:
+            close = buf.find(b'"', quote + 1, hi)
+            while close != -1 and buf[close - 1] == 0x5C and _odd_backslashes(buf, quote + 1, close):
+                close = buf.find(b'"', close + 1, hi)
+            if close == -1:
+                # Unterminated string, leave the rest of the line alone
+                break
+            if (buf.find(b'-', quote + 9, close) != -1
+                    or escapes and buf.find(b'\\u00', quote + 1, close) != -1):
+                out.extend(buf[last:quote + 1])
+                scan_string(buf, quote + 1, close, out)
+                last = close
+            quote = buf.find(b'"', close + 1, hi)
+        out.extend(buf[last:hi])
+
+    return rewrite_line
+
+
+def _new_template() -> bytes:
+    """Return the anonymized UUID stem for a new file, with a fresh random prefix."""
+    return f"{generate_random_prefix()}-0000-0000-0000-".encode('ascii')
+
+
+def _new_rewriter() -> Tuple[Dict[bytes, bytes], Callable[[bytes, int, int, bytearray], None]]:
+    """Return an empty mapping for a new file and a rewriter from make_rewriter bound to it."""
+    mapping: Dict[bytes, bytes] = {}
+    return mapping, make_rewriter(_new_template(), mapping, [0])
+
+
+def _is_valid_json(line: bytes, line_num: Optional[int]) -> bool:
+    """Validate a line for --strict mode, warning on stderr if it is not JSON (unless line_num is None)."""
+    try:
+        json.loads(line)
+    except ValueError as e:
+        if line_num is None:
+            return False
+        # One print per warning so output from parallel workers does not interleave
+        print(f"Warning: Line {line_num} is not valid JSON: {e}\n"
+              f"  Skipping line: {line[:100].decode('utf-8', 'replace').rstrip()}...", file=sys.stderr)
+        return False
+    return True
+
+
+def anonymize_jsonl_stream(infile, outfile, strict: bool = False) -> Dict[bytes, bytes]:
     """
     Anonymize UUIDs in a JSONL stream.
 
+    Lines are rewritten in place at the byte level, so everything except the
+    UUIDs is preserved exactly. In strict mode every line is first validated
+    with json.loads, and lines that are not valid JSON are passed through
+    untouched with a warning.
+
     Args:
-        infile: Input file-like object
-        outfile: Output file-like object
+        infile: Input binary file-like object
+        outfile: Output binary file-like object
+        strict: Validate each line as JSON before rewriting it
 
     Returns:
         Dictionary mapping original UUIDs to anonymized ones
     """
-    # Generate random prefix for this file
-    prefix = generate_random_prefix()
-
-    # Mapping and counter
-    mapping: Dict[str, str] = {}
-    counter = {'count': 0}
+    mapping, rewrite_line = _new_rewriter()
 
+    out = bytearray()
     for line_num, line in enumerate(infile, 1):
-        line = line.strip()
-        if not line:
-            # Preserve empty lines
-            outfile.write('\n')
-            continue
+        # Lines keep their newline; it is never inside a string, so it is
+        # copied through by rewrite_line like any other structural byte
+        if strict and line.strip() and not _is_valid_json(line, line_num):
+            # Write original line
+            out.extend(line)
+        else:
+            rewrite_line(line, 0, len(line), out)
 
-        try:
-            # Parse JSON
-            data = json.loads(line)
+        if len(out) >= IO_BUFFER_SIZE:
+            outfile.write(out)
+            out.clear()
 
-            # Anonymize all UUIDs in the data
-            anonymized_data = anonymize_value(data, mapping, prefix, counter)
+    outfile.write(out)
+    return mapping
 
-            # Write back as JSON
-            outfile.write(json.dumps(anonymized_data, separators=(',', ':')) + '\n')
 
-        except json.JSONDecodeError as e:
-            print(f"Warning: Line {line_num} is not valid JSON: {e}", file=sys.stderr)
-            print(f"  Skipping line: {line[:100]}...", file=sys.stderr)
+def _anonymize_range(buf, lo: int, hi: int, outfile, strict: bool, first_line: Optional[int],
+                     rewrite_line: Callable[[bytes, int, int, bytearray], None]) -> int:
+    """
+    Anonymize the lines in buf[lo:hi], writing them to outfile.
+
+    Lines are rewritten straight out of buf, so no per-line objects are
+    created; output is written in IO_BUFFER_SIZE chunks.
+
+    Args:
+        buf: Buffer holding the input (bytes or mmap)
+        lo: Start of the first line in buf
+        hi: End of the last line in buf
+        outfile: Output binary file-like object
+        strict: Validate each line as JSON before rewriting it
+        first_line: Line number of the first line, for warnings (None to not warn)
+        rewrite_line: Rewriter from make_rewriter
+
+    Returns:
+        The number of lines processed
+    """
+    out = bytearray()
+    pos = lo
+    lines = 0
+    while pos < hi:
+        newline = buf.find(b'\n', pos, hi)
+        end = hi if newline == -1 else newline + 1
+        line_num = None if first_line is None else first_line + lines
+        lines += 1
+
+        if strict and buf[pos:end].strip() and not _is_valid_json(buf[pos:end], line_num):
             # Write original line
-            outfile.write(line + '\n')
+            out.extend(buf[pos:end])
+        else:
+            rewrite_line(buf, pos, end, out)
+
+        if len(out) >= IO_BUFFER_SIZE:
+            outfile.write(out)
+            out.clear()
+        pos = end
+
+    outfile.write(out)
+    return lines
+
+
+def anonymize_jsonl_buffer(buf, outfile, strict: bool = False) -> Dict[bytes, bytes]:
+    """
+    Anonymize UUIDs in a JSONL buffer such as an mmap of the input file.
+
+    Lines are copied exactly, including any surrounding whitespace.
 
+    Args:
+        buf: Buffer holding the whole input (bytes or mmap)
+        outfile: Output binary file-like object
+        strict: Validate each line as JSON before rewriting it
+
+    Returns:
+        Dictionary mapping original UUIDs to anonymized ones
+    """
+    mapping, rewrite_line = _new_rewriter()
+
+    _anonymize_range(buf, 0, len(buf), outfile, strict, 1, rewrite_line)
     return mapping
 
 
-def anonymize_jsonl_file(input_path: Path, output_path: Path) -> Dict[str, str]:
+def _chunk_bounds(buf, count: int) -> List[int]:
+    """Split buf into at most count ranges ending on line boundaries and return their edges."""
+    size = len(buf)
+    bounds = [0]
+    for i in range(1, count):
+        newline = buf.find(b'\n', max(bounds[-1], size * i // count))
+        if newline == -1 or newline + 1 >= size:
+            break
+        bounds.append(newline + 1)
+    bounds.append(size)
+    return bounds
+
+
+def _collect_uuids(input_path: str, lo: int, hi: int, strict: bool) -> Tuple[List[bytes], int]:
     """
-    Anonymize UUIDs in a JSONL file.
+    Parallel pass 1: find the UUIDs in one chunk of the input file.
+
+    Returns:
+        The chunk's UUIDs in first-seen order, and its number of lines
+    """
+    mapping: Dict[bytes, bytes] = {}
+    with open(input_path, 'rb') as infile, open(os.devnull, 'wb') as devnull, \
+         mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        lines = _anonymize_range(mm, lo, hi, devnull, strict, None, make_rewriter(b'', mapping, [0]))
+    return list(mapping), lines
+
+
+def _rewrite_chunk(input_path: str, output_path: str, lo: int, hi: int, strict: bool,
+                   first_line: int, mapping: Dict[bytes, bytes]) -> None:
+    """Parallel pass 2: rewrite one chunk of the input file at the same offset in the output."""
+    with open(input_path, 'rb') as infile, \
+         open(output_path, 'r+b', buffering=IO_BUFFER_SIZE) as outfile, \
+         mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        outfile.seek(lo)
+        _anonymize_range(mm, lo, hi, outfile, strict, first_line, make_rewriter(b'', mapping, [0]))
+        if outfile.tell() != hi:
+            raise RuntimeError(f"Chunk {lo}-{hi} changed length while being anonymized")
+
+
+def anonymize_jsonl_file_parallel(input_path: Path, output_path: Path, strict: bool = False,
+                                  workers: Optional[int] = None) -> Dict[bytes, bytes]:
+    """
+    Anonymize UUIDs in a JSONL file using several processes.
+
+    The file is split into one chunk per worker on line boundaries. Pass 1
+    collects each chunk's UUIDs in first-seen order, and numbering them in
+    chunk order gives exactly the mapping a sequential run would. Pass 2
+    rewrites the chunks in parallel with that frozen mapping. Anonymized
+    UUIDs are as long as the originals, so each chunk is written straight to
+    its own offset in the output file.
 
     Args:
         input_path: Path to input JSONL file
         output_path: Path to output JSONL file
+        strict: Validate each line as JSON before rewriting it
+        workers: Number of processes (defaults to the CPU count)
 
     Returns:
         Dictionary mapping original UUIDs to anonymized ones
     """
-    with open(input_path, 'r', encoding='utf-8') as infile, \
-         open(output_path, 'w', encoding='utf-8') as outfile:
-        return anonymize_jsonl_stream(infile, outfile)
+    workers = workers or os.cpu_count() or 1
+    with open(input_path, 'rb') as infile, \
+         mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        bounds = _chunk_bounds(mm, workers)
+    starts, ends = bounds[:-1], bounds[1:]
+    chunks = len(starts)
+
+    template = _new_template()
+
+    # Mapping and counter
+    mapping: Dict[bytes, bytes] = {}
+    counter = [0]
+
+    with ProcessPoolExecutor(workers) as pool:
+        first_lines = []
+        line_num = 1
+        for uuids, lines in pool.map(_collect_uuids, [str(input_path)] * chunks, starts, ends,
+                                     [strict] * chunks):
+            first_lines.append(line_num)
+            line_num += lines
+            for uuid in uuids:
+                anonymize_uuid(uuid, mapping, template, counter)
+
+        with open(output_path, 'wb') as outfile:
+            outfile.truncate(bounds[-1])
+        for _ in pool.map(_rewrite_chunk, [str(input_path)] * chunks, [str(output_path)] * chunks,
+                          starts, ends, [strict] * chunks, first_lines, [mapping] * chunks):
+            pass
+
+    return mapping
+
+
+def anonymize_jsonl_file(input_path: Path, output_path: Path, strict: bool = False) -> Dict[bytes, bytes]:
+    """
+    Anonymize UUIDs in a JSONL file.
 
+    The input is memory-mapped and rewritten by anonymize_jsonl_buffer, or
+    by anonymize_jsonl_file_parallel once it is at least PARALLEL_MIN_SIZE.
+    Inputs that are not regular files are read by anonymize_jsonl_stream.
 
-def print_mapping(mapping: Dict[str, str]) -> None:
+    Args:
+        input_path: Path to input JSONL file
+        output_path: Path to output JSONL file
+        strict: Validate each line as JSON before rewriting it
+
+    Returns:
+        Dictionary mapping original UUIDs to anonymized ones
+    """
+    if input_path.stat().st_size >= PARALLEL_MIN_SIZE and (os.cpu_count() or 1) > 1:
+        return anonymize_jsonl_file_parallel(input_path, output_path, strict)
+
+    with open(input_path, 'rb', buffering=IO_BUFFER_SIZE) as infile, \
+         open(output_path, 'wb', buffering=IO_BUFFER_SIZE) as outfile:
+        info = os.fstat(infile.fileno())
+        if not stat.S_ISREG(info.st_mode):
+            # Pipes and devices (e.g. process substitution) cannot be mapped
+            return anonymize_jsonl_stream(infile, outfile, strict)
+        if info.st_size == 0:
+            # Empty files cannot be mapped
+            return {}
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return anonymize_jsonl_buffer(mm, outfile, strict)
+
+
+def print_mapping(mapping: Dict[bytes, bytes]) -> None:
     """Print the UUID mapping for reference."""
     print(f"\nAnonymized {len(mapping)} unique UUIDs:")
     print("=" * 80)
     for original, anonymized in sorted(mapping.items()):
-        print(f"{original} -> {anonymized}")
+        print(f"{original.decode('ascii')} -> {anonymized.decode('ascii')}")
 
 
 def main():
     """Main entry point."""
-    # Check for --in-place and --show-mapping flags
+    # Check for --in-place, --show-mapping and --strict flags
     in_place = '--in-place' in sys.argv
     show_mapping = '--show-mapping' in sys.argv
+    strict = '--strict' in sys.argv
     args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
 
     # Determine if we're in pipe mode (stdin/stdout)
@@ -174,7 +622,7 @@ def main():
 
     if use_stdin:
         # Pipe mode: read from stdin, write to stdout
-        mapping = anonymize_jsonl_stream(sys.stdin, sys.stdout)
+        mapping = anonymize_jsonl_stream(sys.stdin.buffer, sys.stdout.buffer, strict)
         print(f"Anonymized {len(mapping)} unique UUIDs", file=sys.stderr)
         if show_mapping:
             print_mapping(mapping)
@@ -188,9 +636,9 @@ def main():
 
     # Determine output path
     if in_place:
-        # Write to a temporary file first, then move it
-        temp_fd, temp_path = tempfile.mkstemp(suffix='.jsonl', text=True)
-        import os
+        # Write to a temporary file next to the input first, so the final
+        # move is an atomic rename on the same filesystem
+        temp_fd, temp_path = tempfile.mkstemp(suffix='.jsonl', dir=input_path.parent)
         os.close(temp_fd)  # Close the file descriptor, we'll open it normally
         output_path = Path(temp_path)
         print(f"Anonymizing UUIDs in-place: {input_path}")
@@ -204,11 +652,17 @@ def main():
         print(f"Output will be written to: {output_path}")
 
     # Process the file
-    mapping = anonymize_jsonl_file(input_path, output_path)
+    try:
+        mapping = anonymize_jsonl_file(input_path, output_path, strict)
+    except BaseException:
+        if in_place:
+            output_path.unlink()
+        raise
 
     # If in-place mode, replace the original file
     if in_place:
-        shutil.move(str(output_path), str(input_path))
+        shutil.copymode(input_path, output_path)
+        os.replace(output_path, input_path)
         print(f"\n✓ Successfully anonymized {len(mapping)} unique UUIDs")
         print(f"✓ Original file overwritten: {input_path}")
     else:
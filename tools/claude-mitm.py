@@ -4,8 +4,18 @@
 import asyncio
 import json
 import os
+import re
 import sys
-from datetime import datetime
+import time
+
+# orjson is much faster and works on bytes directly; fall back to stdlib json
+# (always under PyPy, where json is JIT-compiled and C extensions are slow to call)
+orjson = None
+if sys.implementation.name != "pypy":
+    try:
+        import orjson
+    except ImportError:
+        pass
 
 # Path to real binary (same directory as this script)
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -13,47 +23,112 @@ REAL_BINARY = os.path.join(SCRIPT_DIR, "_real_claude")
 
 # Log file location
 LOG_FILE = os.path.expanduser("~/claude_mitm.log")
+LOG_BUFFER_SIZE = 1 << 16
 
+# Set CLAUDE_MITM_NO_JSON_DETECT=1 to log every line as text without trying
+# to parse it (arguments cannot be used, they all go to the real binary)
+JSON_DETECT = not os.environ.get("CLAUDE_MITM_NO_JSON_DETECT")
 
-def log(direction: str, data: bytes):
-    """Append timestamped log entry as JSON."""
-    timestamp = datetime.now().isoformat(timespec="milliseconds")
+# orjson turns integers beyond 64 bits into floats; lines with a run of this
+# many digits are parsed and logged with stdlib json so they stay exact
+BIG_NUMBER = re.compile(rb"\d{20}")
 
-    # Try to decode as UTF-8 text
-    try:
-        text = data.decode("utf-8", errors="replace")
-    except Exception:
-        text = repr(data)
+# Size of each read from the pipes, and the StreamReader buffer limit
+# (large enough to hold a full read without splitting it)
+READ_SIZE = 1 << 18
+PIPE_LIMIT = 1 << 20
+
+# Queue of serialized log entries, drained by log_writer()
+log_queue = None
+
+# Formatted local time of the last whole second a timestamp was made for
+last_second = None
+last_second_text = ""
 
-    # Try to parse as JSON
+
+def timestamp() -> str:
+    """Return the local time in ISO 8601 format with milliseconds."""
+    global last_second, last_second_text
+    now = time.time()
+    second = int(now)
+    if second != last_second:
+        last_second = second
+        last_second_text = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(second))
+    return f"{last_second_text}.{int((now - second) * 1000):03d}"
+
+
+def log(direction: str, data: bytes):
+    """Append timestamped log entry as JSON."""
     log_entry = {
-        "time": timestamp,
+        "time": timestamp(),
         "fd": direction,
     }
 
-    try:
-        parsed_json = json.loads(text)
+    # Try to parse as JSON; only objects and arrays are worth the attempt
+    is_json = False
+    use_orjson = orjson is not None
+    if JSON_DETECT and data[:1] in (b"{", b"["):
+        if use_orjson and BIG_NUMBER.search(data):
+            use_orjson = False
+        try:
+            parsed_json = orjson.loads(data) if use_orjson else json.loads(data)
+            is_json = True
+        except ValueError:
+            pass
+
+    if is_json:
         log_entry["type"] = "json"
         log_entry["json"] = parsed_json
-    except (json.JSONDecodeError, ValueError):
+    else:
         log_entry["type"] = "text"
-        log_entry["text"] = text
+        log_entry["text"] = data.decode("utf-8", errors="replace")
+
+    if use_orjson:
+        entry = orjson.dumps(log_entry)
+    else:
+        # Same compact UTF-8 format as orjson; lone surrogates (which json.loads
+        # accepts) can only occur in strings, where \uXXXX is their JSON escape
+        entry = json.dumps(log_entry, separators=(",", ":"), ensure_ascii=False).encode(
+            "utf-8", "backslashreplace")
+    log_queue.put_nowait(entry + b"\n")
 
-    with open(LOG_FILE, "a") as f:
-        f.write(json.dumps(log_entry) + "\n")
+
+async def log_writer():
+    """Write queued log entries to LOG_FILE until a None entry arrives."""
+    with open(LOG_FILE, "ab", buffering=LOG_BUFFER_SIZE) as f:
+        while True:
+            entry = await log_queue.get()
+            if entry is None:
+                break
+            f.write(entry)
+            # Flush once the queue has drained so bursts are coalesced
+            if log_queue.empty():
+                f.flush()
+
+
+def log_lines(direction: str, buffer: bytearray):
+    """Log each complete line in buffer, then remove those lines from it."""
+    start = 0
+    newline = buffer.find(b"\n")
+    while newline != -1:
+        if newline > start:  # Skip empty lines
+            log(direction, bytes(buffer[start:newline]))
+        start = newline + 1
+        newline = buffer.find(b"\n", start)
+    del buffer[:start]
 
 
 async def pipe_stdin(proc_stdin):
     """Read stdin and forward to process."""
     loop = asyncio.get_event_loop()
-    reader = asyncio.StreamReader()
+    reader = asyncio.StreamReader(limit=PIPE_LIMIT)
     protocol = asyncio.StreamReaderProtocol(reader)
     await loop.connect_read_pipe(lambda: protocol, sys.stdin.buffer)
 
-    buffer = b""
+    buffer = bytearray()
     try:
         while True:
-            data = await reader.read(4096)
+            data = await reader.read(READ_SIZE)
             if not data:
                 break
 
@@ -61,30 +136,26 @@ async def pipe_stdin(proc_stdin):
             proc_stdin.write(data)
             await proc_stdin.drain()
 
-            # Accumulate data in buffer for logging
-            buffer += data
-
-            # Process complete lines for logging (newline-delimited JSON)
-            while b"\n" in buffer:
-                line, buffer = buffer.split(b"\n", 1)
-                if line:  # Skip empty lines
-                    log("STDIN", line)
+            # Accumulate data in buffer and log complete lines
+            # (newline-delimited JSON)
+            buffer.extend(data)
+            log_lines("STDIN", buffer)
 
     except Exception as e:
         log("STDIN_ERROR", str(e).encode())
     finally:
         # Log any remaining buffered data
         if buffer:
-            log("STDIN", buffer)
+            log("STDIN", bytes(buffer))
         proc_stdin.close()
 
 
 async def pipe_output(proc_stream, out_stream, direction: str):
     """Read from process and forward to our stdout/stderr."""
-    buffer = b""
+    buffer = bytearray()
     try:
         while True:
-            data = await proc_stream.read(4096)
+            data = await proc_stream.read(READ_SIZE)
             if not data:
                 break
 
@@ -92,26 +163,24 @@ async def pipe_output(proc_stream, out_stream, direction: str):
             out_stream.buffer.write(data)
             out_stream.buffer.flush()
 
-            # Accumulate data in buffer for logging
-            buffer += data
-
-            # Process complete lines for logging (newline-delimited JSON)
-            while b"\n" in buffer:
-                line, buffer = buffer.split(b"\n", 1)
-                if line:  # Skip empty lines
-                    log(direction, line)
+            # Accumulate data in buffer and log complete lines
+            # (newline-delimited JSON)
+            buffer.extend(data)
+            log_lines(direction, buffer)
 
     except Exception as e:
         log(f"{direction}_ERROR", str(e).encode())
     finally:
         # Log any remaining buffered data
         if buffer:
-            log(direction, buffer)
-            out_stream.buffer.write(buffer)
-            out_stream.buffer.flush()
+            log(direction, bytes(buffer))
 
 
 async def main():
+    global log_queue
+    log_queue = asyncio.Queue()
+    writer = asyncio.create_task(log_writer())
+
     # Log startup
     log("STARTUP", f"Args: {sys.argv[1:]}".encode())
 
@@ -122,6 +191,7 @@ async def main():
         stdin=asyncio.subprocess.PIPE,
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE,
+        limit=PIPE_LIMIT,
     )
 
     # Run all pipes concurrently
@@ -143,6 +213,8 @@ async def main():
             pass
 
     log("EXIT", f"Return code: {proc.returncode}".encode())
+    log_queue.put_nowait(None)
+    await writer
     sys.exit(proc.returncode)
 
 
@@ -0,0 +1,15 @@
+#!/bin/sh
+# Run one of the Python tools under PyPy when it is installed, else python3.
+# The anonymizer and MitM proxy are long-running pure-Python loops, which
+# PyPy's JIT speeds up considerably.
+#
+#   tools/run_under_pypy.sh tools/anonymize_uuids.py big.jsonl
+
+if [ -z "$1" ]; then
+	echo "$0 <script> [args...]"
+	exit 1
+fi
+if command -v pypy3 >/dev/null 2>&1; then
+	exec pypy3 "$@"
+fi
+exec python3 "$@"
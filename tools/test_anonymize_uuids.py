@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Regression tests for anonymize_uuids.py.
+
+The anonymizer rewrites raw JSON lines without decoding them, so these check
+it against the reference behaviour: a regex word-boundary match on the
+decoded string values.
+
+Run with: python -m unittest test_anonymize_uuids (from the tools directory)
+"""
+
+import contextlib
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import anonymize_uuids
+
+UUID = '12345678-1234-1234-1234-123456789012'
+
+
+def anonymize(line: bytes, strict: bool = False) -> bytes:
+    """Anonymize a single JSONL line and return the output."""
+    outfile = io.BytesIO()
+    anonymize_uuids.anonymize_jsonl_stream(io.BytesIO(line), outfile, strict)
+    return outfile.getvalue()
+
+
+class EscapeBoundaryTests(unittest.TestCase):
+    """UUID candidates next to JSON escapes and non-ASCII characters."""
+
+    def assertAnonymized(self, raw: str, replaced: bool):
+        """Check the string literal raw is rewritten to valid JSON, with or without its UUID replaced."""
+        line = ('{"a":"%s"}\n' % raw).encode('utf-8')
+        original = json.loads(line)['a']
+        value = json.loads(anonymize(line))['a']
+        if replaced:
+            self.assertNotIn(UUID[1:], value)
+            self.assertEqual(len(value), len(original))
+        else:
+            self.assertEqual(value, original)
+
+    def test_plain(self):
+        self.assertAnonymized(UUID, True)
+
+    def test_after_two_character_escape(self):
+        # \n decodes to a newline, which is a word boundary
+        self.assertAnonymized('\\n' + UUID, True)
+        self.assertAnonymized('\\"' + UUID, True)
+
+    def test_starts_inside_escape(self):
+        # \b and \f are escapes, not hex digits, so there is no UUID here
+        self.assertAnonymized('\\b' + UUID[1:], False)
+        self.assertAnonymized('\\f' + UUID[1:], False)
+
+    def test_starts_inside_unicode_escape(self):
+        # The UUID would start on each of the four hex digits of the escape
+        for i in range(4):
+            self.assertAnonymized('\\u' + 'a' * i + UUID, False)
+        self.assertAnonymized('\\u2020' + UUID, True)
+        self.assertAnonymized('\\u00e9' + UUID, False)
+
+    def test_after_escaped_backslash(self):
+        self.assertAnonymized('\\\\' + UUID, True)
+        self.assertAnonymized('\\\\b' + UUID[1:], True)
+        self.assertAnonymized('\\\\\\b' + UUID[1:], False)
+
+    def test_escaped_uuid_characters(self):
+        self.assertAnonymized('\\u0041' + UUID[1:], True)
+        self.assertAnonymized(UUID[:8] + '\\u002d' + UUID[9:], True)
+        self.assertAnonymized('\\ud83d\\ude00\\u0031' + UUID[1:], True)
+        self.assertAnonymized('x\\u0031' + UUID[1:], False)
+        self.assertAnonymized('\\\\u0041' + UUID[1:], False)
+
+    def test_escaped_uuid_keeps_its_escapes(self):
+        line = ('{"a":"\\u0031%s\\u0032"}\n' % UUID[1:-1]).encode('ascii')
+        output = anonymize(line)
+        self.assertEqual(len(output), len(line))
+        self.assertTrue(output.startswith(b'{"a":"\\u00'))
+        self.assertEqual(json.loads(output)['a'][-12:], '000000000001')
+
+    def test_multibyte_utf8(self):
+        # é is a word character, € is not
+        self.assertAnonymized('é' + UUID, False)
+        self.assertAnonymized('€' + UUID, True)
+        self.assertAnonymized(UUID + 'é', False)
+        self.assertAnonymized(UUID + '€', True)
+
+    def test_trailing_word_character(self):
+        self.assertAnonymized(UUID + 'x', False)
+        self.assertAnonymized(UUID + '_', False)
+        self.assertAnonymized(UUID + '-', True)
+        self.assertAnonymized(UUID + '\\u0078', False)
+
+
+class RewriteTests(unittest.TestCase):
+    """Whole-line rewriting."""
+
+    def test_consistent_mapping(self):
+        line = ('{"%s":["%s","%s"]}\n' % (UUID, UUID.upper(), UUID)).encode('ascii')
+        value = json.loads(anonymize(line))
+        (key, items), = value.items()
+        self.assertEqual(items, [key, key])
+        self.assertTrue(key.endswith('-0000-0000-0000-000000000001'))
+
+    def test_only_strings_rewritten(self):
+        line = b'{"a": 1 , "b":"x"}  \r\n\n'
+        self.assertEqual(anonymize(line), line)
+
+    def test_strict_accepts_what_json_accepts(self):
+        # Truncated tool output can leave a lone surrogate escape
+        line = ('{"a":"\\ud800 %s","b":NaN}\n' % UUID).encode('ascii')
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            output = anonymize(line, strict=True)
+        self.assertEqual(stderr.getvalue(), '')
+        self.assertNotIn(UUID.encode('ascii'), output)
+
+    def test_strict_skips_invalid_lines(self):
+        line = ('not json %s\n' % UUID).encode('ascii')
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual(anonymize(line, strict=True), line)
+
+
+class StringCacheTests(unittest.TestCase):
+    """Caching of rewritten string literals."""
+
+    def rewrite(self, cache, raw: bytes) -> bytes:
+        """Rewrite one line with a rewriter that caches into cache."""
+        rewrite_line = anonymize_uuids.make_rewriter(b'deadbeef-0000-0000-0000-', {}, [0], cache)
+        out = bytearray()
+        rewrite_line(raw, 0, len(raw), out)
+        return bytes(out)
+
+    def test_repeated_string_cached(self):
+        cache = {}
+        text = (UUID + ' ') * 4
+        line = ('{"a":"%s","b":"%s"}\n' % (text, text)).encode('ascii')
+        self.assertEqual(json.loads(self.rewrite(cache, line))['a'],
+                         'deadbeef-0000-0000-0000-000000000001 ' * 4)
+        self.assertEqual(list(cache), [text.encode('ascii')])
+
+    def test_long_string_not_cached(self):
+        cache = {}
+        text = UUID + ' ' + 'x' * anonymize_uuids.STRING_CACHE_MAX_LENGTH
+        line = ('{"a":"%s"}\n' % text).encode('ascii')
+        self.assertNotIn(UUID, json.loads(self.rewrite(cache, line))['a'])
+        self.assertEqual(cache, {})
+
+
+class ParallelTests(unittest.TestCase):
+    """anonymize_jsonl_file_parallel must give exactly the sequential result."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        patcher = mock.patch.object(anonymize_uuids, 'generate_random_prefix', return_value='deadbeef')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def sample(self, trailing_newline: bool) -> bytes:
+        """Build a small log that reuses UUIDs across lines and includes blank and invalid lines."""
+        uuids = ['%08x-1234-1234-1234-%012x' % (i, i * 7) for i in range(40)]
+        lines = []
+        for i in range(300):
+            if i % 50 == 7:
+                lines.append(b'not json %s' % uuids[i % 40].encode('ascii'))
+            elif i % 50 == 8:
+                lines.append(b'')
+            elif i % 50 == 9:
+                lines.append(('{"escaped":"\\u0041%s"}' % uuids[i % 40][1:]).encode('ascii'))
+            else:
+                lines.append(('{"id":"%s","parent":"%s","n":%d}' % (
+                    uuids[i % 40], uuids[(i * 3) % 40].upper(), i)).encode('ascii'))
+        data = b'\n'.join(lines)
+        return data + b'\n' if trailing_newline else data
+
+    def check(self, data: bytes, workers: int, strict: bool):
+        input_path = self.dir / 'in.jsonl'
+        output_path = self.dir / 'out.jsonl'
+        input_path.write_bytes(data)
+
+        expected = io.BytesIO()
+        with contextlib.redirect_stderr(io.StringIO()):
+            expected_mapping = anonymize_uuids.anonymize_jsonl_stream(io.BytesIO(data), expected, strict)
+            mapping = anonymize_uuids.anonymize_jsonl_file_parallel(input_path, output_path, strict, workers)
+
+        self.assertEqual(output_path.read_bytes(), expected.getvalue())
+        self.assertEqual(mapping, expected_mapping)
+
+    def test_matches_sequential(self):
+        for trailing_newline in (True, False):
+            for strict in (False, True):
+                for workers in (1, 2, 3, 7):
+                    with self.subTest(trailing_newline=trailing_newline, strict=strict, workers=workers):
+                        self.check(self.sample(trailing_newline), workers, strict)
+
+    def test_more_workers_than_lines(self):
+        self.check(('{"id":"%s"}\n' % UUID).encode('ascii'), 4, False)
+
+    def test_length_change_detected(self):
+        input_path = self.dir / 'in.jsonl'
+        output_path = self.dir / 'out.jsonl'
+        data = ('{"id":"%s"}\n' % UUID).encode('ascii')
+        input_path.write_bytes(data)
+        output_path.write_bytes(b'\0' * len(data))
+        with self.assertRaises(RuntimeError):
+            anonymize_uuids._rewrite_chunk(str(input_path), str(output_path), 0, len(data), False, 1,
+                                           {UUID.encode('ascii'): b'too-short'})
+
+
+if __name__ == '__main__':
+    unittest.main()